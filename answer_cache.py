@@ -0,0 +1,147 @@
+import re
+import math
+import time
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+# Only words that do not change what is being asked are dropped. Unlike the
+# retrieval stopwords, question words and negations are kept.
+FILLER_WORDS = {
+    "a", "an", "the", "i", "me", "my", "we", "our", "you", "your", "is", "are",
+    "am", "be", "do", "does", "did", "can", "could", "would", "should",
+    "please", "tell",
+}
+QUESTION_WORDS = {"how", "what", "when", "where", "which", "who", "whom", "whose", "why"}
+NEGATIONS = {"not", "no", "never", "nor", "without", "cannot", "t"}
+
+
+def normalize_question(question: str) -> str:
+    """Lowercases a question and collapses punctuation and whitespace."""
+    return " ".join(re.findall(r"\w+", question.lower()))
+
+
+def tokenize_question(question: str) -> List[str]:
+    """Splits a question into words, dropping filler words and plural endings."""
+    tokens = []
+    for token in normalize_question(question).split():
+        if token in FILLER_WORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def question_signature(question: str) -> Tuple[FrozenSet[str], bool]:
+    """
+    Returns the question words and whether the question is negated. Cached
+    answers are only reused for questions with the same signature, so e.g.
+    'how' and 'when' questions about the same topic never share an answer.
+    """
+    tokens = set(normalize_question(question).split())
+    return frozenset(tokens & QUESTION_WORDS), bool(tokens & NEGATIONS)
+
+
+def embed(question: str) -> Dict[str, float]:
+    """
+    Embeds a question as an L2-normalized sparse vector of its words and their
+    character trigrams. Trigrams keep scripts without word spacing (e.g. Khmer)
+    and small typos comparable.
+    """
+    tokens = tokenize_question(question)
+    features = Counter(tokens)
+    padded = f" {' '.join(tokens)} "
+    features.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    norm = math.sqrt(sum(v * v for v in features.values()))
+    if not norm:
+        return {}
+    return {feature: value / norm for feature, value in features.items()}
+
+
+def cosine_similarity(a: Dict[str, float], b: Dict[str, float]) -> float:
+    """Returns the cosine similarity of two normalized sparse vectors."""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(value * b.get(feature, 0.0) for feature, value in a.items())
+
+
+class CacheEntry(NamedTuple):
+    language: str
+    signature: Tuple[FrozenSet[str], bool]
+    vector: Dict[str, float]
+    answer: str
+    created_at: float
+
+
+class AnswerCache:
+    """
+    An in-memory cache of answers to context-free questions.
+
+    Lookups embed the question and return the answer of the most similar cached
+    question in the same language and with the same question words and
+    negation, if its similarity reaches the threshold.
+    Entries expire after ttl_seconds and the least recently used entry is
+    evicted once max_size is reached.
+    """
+
+    def __init__(self, max_size: int = 256, ttl_seconds: float = 86400, threshold: float = 0.9):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self._entries: "OrderedDict[tuple, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float):
+        expired = [
+            key
+            for key, entry in self._entries.items()
+            if now - entry.created_at > self.ttl_seconds
+        ]
+        for key in expired:
+            del self._entries[key]
+
+    def get(self, question: str, language: str) -> Optional[str]:
+        """Returns a cached answer for a similar question, or None."""
+        if self.max_size <= 0:
+            return None
+        vector = embed(question)
+        if not vector:
+            return None
+        signature = question_signature(question)
+        with self._lock:
+            self._expire(time.monotonic())
+            best_key, best_score = None, 0.0
+            for key, entry in self._entries.items():
+                if entry.language != language or entry.signature != signature:
+                    continue
+                score = cosine_similarity(vector, entry.vector)
+                if score > best_score:
+                    best_key, best_score = key, score
+            if best_key is None or best_score < self.threshold:
+                return None
+            self._entries.move_to_end(best_key)
+            return self._entries[best_key].answer
+
+    def put(self, question: str, language: str, answer: str):
+        """Caches the answer to a question."""
+        if self.max_size <= 0:
+            return
+        vector = embed(question)
+        if not vector:
+            return
+        key = (language, normalize_question(question))
+        with self._lock:
+            self._entries[key] = CacheEntry(
+                language,
+                question_signature(question),
+                vector,
+                answer,
+                time.monotonic(),
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,344 @@
+"""
+Bulk offline diagnosis of rice plant images.
+
+Runs every image in a directory (or listed in a manifest file) through the same
+graph workflow used by the Telegram bot and writes one report per image.
+
+Usage:
+    python batch.py ./field_photos --output ./reports --language Khmer
+    python batch.py manifest.txt --output ./reports --concurrency 8 --rate 120
+    python batch.py ./field_photos --output ./reports --stand-in-llm
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import argparse
+import logging
+import hashlib
+import datetime
+import mimetypes
+
+from langchain_core.messages import AIMessage
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+ALLOWED_MIME_TYPES = ["image/jpeg", "image/png"]
+PROGRESS_FILENAME = "progress.jsonl"
+
+STAND_IN_REPORT = """🌾 RIDA - Rice Disease AI Assistant Report
+Report ID: {report_id}
+
+1. DIAGNOSIS
+
+*   Primary Diagnosis: Brown Spot
+*   Confidence Level: Medium
+
+(Generated by the stand-in model for throughput measurement.)"""
+
+
+class StandInLLM:
+    """
+    A stand-in for the Gemini client that returns a canned report after a fixed delay.
+    Used to measure the throughput of the batch pipeline without calling the real model.
+    """
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def invoke(self, messages) -> AIMessage:
+        time.sleep(self.latency)
+        report_id = re.search(r"Report ID: (\d+)", messages[0].content)
+        return AIMessage(
+            content=STAND_IN_REPORT.format(
+                report_id=report_id.group(1) if report_id else "00"
+            )
+        )
+
+
+class RateLimiter:
+    """Spaces out request start times so that at most `per_minute` requests start each minute."""
+
+    def __init__(self, per_minute: float | None):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def collect_images(source: str) -> list[tuple[str, str]]:
+    """
+    Collects the images to diagnose from a directory or a manifest file.
+
+    A manifest is a text file with one image path per line. Relative paths are
+    resolved against the manifest's directory; blank lines and lines starting
+    with '#' are ignored.
+
+    Returns:
+        A list of (key, path) tuples, where the key is the image path relative
+        to the source and is used to name results and track progress.
+    """
+    if os.path.isdir(source):
+        base_dir = source
+        paths = []
+        for root, _, files in os.walk(source):
+            for name in files:
+                paths.append(os.path.join(root, name))
+        paths.sort()
+    else:
+        base_dir = os.path.dirname(os.path.abspath(source))
+        paths = []
+        with open(source, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                paths.append(os.path.join(base_dir, line))
+
+    images = []
+    for path in paths:
+        if mimetypes.guess_type(path)[0] not in ALLOWED_MIME_TYPES:
+            logging.warning(f"Skipping unsupported file: {path}")
+            continue
+        images.append((os.path.relpath(path, base_dir), path))
+    return images
+
+
+def result_filename(key: str) -> str:
+    """
+    Returns a flat, filesystem-safe result filename for an image key.
+    A short hash of the key keeps e.g. 'sub/p1.jpg' and 'sub_p1.jpg' apart.
+    """
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:8]
+    safe_key = re.sub(r"[^\w.-]+", "_", key)
+    return f"{safe_key}.{digest}.txt"
+
+
+def load_progress(output_dir: str) -> set[str]:
+    """Returns the keys of images that were already diagnosed in a previous run."""
+    progress_path = os.path.join(output_dir, PROGRESS_FILENAME)
+    done = set()
+    if not os.path.exists(progress_path):
+        return done
+    with open(progress_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if entry.get("status") == "done":
+                done.add(entry["image"])
+    return done
+
+
+def record_progress(output_dir: str, data: dict):
+    """Appends a progress entry to the progress file."""
+    progress_path = os.path.join(output_dir, PROGRESS_FILENAME)
+    data["timestamp"] = datetime.datetime.now().isoformat()
+    with open(progress_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(data, ensure_ascii=False) + "\n")
+
+
+async def diagnose_image(
+    graph_app,
+    key: str,
+    path: str,
+    report_id: int,
+    language: str,
+    output_dir: str,
+) -> str:
+    """
+    Runs a single image through the graph and writes its report.
+
+    Returns:
+        The name of the written result file.
+    """
+    from graph import new_chat, ERROR_GENERATION
+
+    mime_type = mimetypes.guess_type(path)[0]
+    with open(path, "rb") as f:
+        image_bytes = f.read()
+
+    inputs = new_chat()
+    inputs.update(
+        {
+            "image_bytes": image_bytes,
+            "image_mime_type": mime_type,
+            "language": language,
+            "report_id": report_id,
+        }
+    )
+    final_state = await asyncio.to_thread(graph_app.invoke, inputs)
+    generation = final_state.get("generation")
+    if not generation or generation == ERROR_GENERATION:
+        raise RuntimeError("The model did not return a report.")
+
+    filename = result_filename(key)
+    with open(os.path.join(output_dir, filename), "w", encoding="utf-8") as f:
+        f.write(generation)
+    return filename
+
+
+async def run_batch(
+    graph_app,
+    images: list[tuple[str, str]],
+    language: str,
+    output_dir: str,
+    concurrency: int,
+    rate_per_minute: float | None,
+) -> dict:
+    """
+    Diagnoses all images that are not yet recorded as done in the output directory.
+
+    Returns:
+        A summary with the number of processed, failed and skipped images and
+        the achieved throughput.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    done = load_progress(output_dir)
+    semaphore = asyncio.Semaphore(concurrency)
+    rate_limiter = RateLimiter(rate_per_minute)
+    summary = {"processed": 0, "failed": 0, "skipped": 0}
+
+    async def worker(report_id: int, key: str, path: str):
+        if key in done:
+            summary["skipped"] += 1
+            return
+        async with semaphore:
+            await rate_limiter.wait()
+            started = time.monotonic()
+            try:
+                filename = await diagnose_image(
+                    graph_app, key, path, report_id, language, output_dir
+                )
+            except Exception as e:
+                logging.error(f"Failed to diagnose {key}: {e}")
+                summary["failed"] += 1
+                record_progress(
+                    output_dir, {"image": key, "status": "failed", "error": str(e)}
+                )
+                return
+            seconds = time.monotonic() - started
+            summary["processed"] += 1
+            record_progress(
+                output_dir,
+                {
+                    "image": key,
+                    "status": "done",
+                    "result": filename,
+                    "seconds": round(seconds, 3),
+                },
+            )
+            logging.info(f"Diagnosed {key} in {seconds:.2f}s -> {filename}")
+
+    started = time.monotonic()
+    await asyncio.gather(
+        *(
+            worker(report_id, key, path)
+            for report_id, (key, path) in enumerate(images, 1)
+        )
+    )
+    elapsed = time.monotonic() - started
+
+    summary["elapsed_seconds"] = round(elapsed, 3)
+    summary["images_per_minute"] = (
+        round(summary["processed"] * 60 / elapsed, 2) if elapsed > 0 else 0.0
+    )
+    return summary
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Diagnose a directory or manifest of rice plant images offline."
+    )
+    parser.add_argument(
+        "source", help="A directory of images or a manifest file listing image paths."
+    )
+    parser.add_argument(
+        "--output", default="batch_results", help="Directory for reports and progress."
+    )
+    parser.add_argument(
+        "--language", default="English", help="Language of the generated reports."
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="Maximum images processed at once."
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=None,
+        help="Maximum model requests started per minute (unlimited by default).",
+    )
+    parser.add_argument(
+        "--stand-in-llm",
+        action="store_true",
+        help="Replace the Gemini model with a local stand-in to measure throughput.",
+    )
+    parser.add_argument(
+        "--stand-in-latency",
+        type=float,
+        default=2.0,
+        help="Seconds the stand-in model takes per request.",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Runs the batch diagnosis from the command line."""
+    args = parse_args(argv)
+    if args.concurrency < 1:
+        logging.error("--concurrency must be at least 1.")
+        return 2
+    if not os.path.exists(args.source):
+        logging.error(f"Source not found: {args.source}")
+        return 2
+
+    import graph
+
+    if args.stand_in_llm:
+        graph.set_llm(StandInLLM(args.stand_in_latency))
+        logging.info(
+            f"Using the stand-in model with {args.stand_in_latency}s latency per request."
+        )
+
+    # Load everything once up front rather than racing in the worker threads,
+    # and fail fast on a missing configuration instead of on every image.
+    try:
+        graph.warm_up()
+    except Exception as e:
+        logging.error(f"Failed to initialize the graph: {e}")
+        return 2
+
+    images = collect_images(args.source)
+    logging.info(f"Found {len(images)} images in {args.source}.")
+
+    summary = asyncio.run(
+        run_batch(
+            graph.get_app(),
+            images,
+            args.language,
+            args.output,
+            args.concurrency,
+            args.rate,
+        )
+    )
+    logging.info(
+        f"Processed {summary['processed']} images ({summary['failed']} failed, "
+        f"{summary['skipped']} already done) in {summary['elapsed_seconds']}s: "
+        f"{summary['images_per_minute']} images/minute."
+    )
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Startup benchmark for the bot.
+
+Each run starts a fresh Python process and measures:
+    - bot_import_s: time to import bot.py.
+    - first_help_reply_s: time from process start until /help is answered.
+    - graph_warm_up_s: time for graph.warm_up() (prompt, index, client, graph).
+    - first_answer_s: time from process start until the first text question is
+      answered by the graph, using the stand-in model so no API call is made.
+
+Usage:
+    python bench_startup.py --runs 5
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+import subprocess
+from types import SimpleNamespace
+
+PROCESS_START = time.perf_counter()
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure() -> dict:
+    """Measures a single cold start in the current process."""
+    # Only needed to construct the real client during warm-up; it is never called.
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "benchmark")
+    os.environ.setdefault("GEMINI_MODEL", "benchmark")
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+    started = time.perf_counter()
+    import bot
+
+    results = {"bot_import_s": time.perf_counter() - started}
+
+    async def reply_text(text, **kwargs):
+        results["first_help_reply_s"] = time.perf_counter() - PROCESS_START
+
+    update = SimpleNamespace(
+        message=SimpleNamespace(reply_text=reply_text),
+        effective_chat=SimpleNamespace(id=0),
+    )
+    asyncio.run(bot.help_command(update, SimpleNamespace()))
+
+    import graph
+    from batch import StandInLLM
+
+    started = time.perf_counter()
+    graph.warm_up()
+    results["graph_warm_up_s"] = time.perf_counter() - started
+
+    graph.set_llm(StandInLLM(latency=0))
+    inputs = graph.new_chat()
+    inputs["question"] = "How do I treat brown spot?"
+    graph.get_app().invoke(inputs)
+    results["first_answer_s"] = time.perf_counter() - PROCESS_START
+
+    return {key: round(value, 3) for key, value in results.items()}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the bot's cold start.")
+    parser.add_argument("--runs", type=int, default=5, help="Number of cold starts.")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure()))
+        return 0
+
+    runs = []
+    env = dict(os.environ, PYTHONPATH=REPO_DIR)
+    with tempfile.TemporaryDirectory() as work_dir:
+        for _ in range(args.runs):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child"],
+                cwd=work_dir,
+                env=env,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    for key in runs[0]:
+        values = [run[key] for run in runs]
+        print(
+            f"{key:>20}: median {statistics.median(values):.3f}s "
+            f"(min {min(values):.3f}s, max {max(values):.3f}s)"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
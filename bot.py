@@ -1,4 +1,6 @@
 import os
+import math
+import asyncio
 import logging
 import datetime
 import mimetypes
@@ -14,11 +16,12 @@ from telegram.ext import (
 )
 from telegram.error import BadRequest
 
+import quota
 import storage
-from graph import app, new_chat, llm
 
 load_dotenv()
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL")
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 
@@ -63,19 +66,27 @@ async def language(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 
 async def set_language(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Sets the language for the conversation."""
+    import graph
+
     language = update.message.text
     user = update.effective_user
     chat_id = update.effective_chat.id
 
     storage.store_message(chat_id, user.full_name, f"Set language to: {language}")
 
+    wait_seconds = quota.acquire(chat_id)
+    if wait_seconds:
+        await reply_quota_exceeded(update, wait_seconds)
+        return CHOOSING_LANGUAGE
+
     checking_msg_text = f"Changing the assistant language to '{language}'..."
     checking_msg = await update.message.reply_text(checking_msg_text)
     storage.store_bot_response(chat_id, checking_msg_text)
 
     try:
         prompt = f"Can you generate text in the language '{language}'? Please answer with only 'yes' or 'no'."
-        response = await llm.ainvoke(prompt)
+        response = await graph.get_llm().ainvoke(prompt)
+        quota.record_usage(chat_id, response.usage_metadata)
         supported = "yes" in response.content.lower()
     except Exception as e:
         logging.error(f"Language check with LLM failed: {e}")
@@ -83,7 +94,7 @@ async def set_language(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
 
     if supported:
         context.user_data["language"] = language
-        state = context.user_data.get("state", new_chat())
+        state = context.user_data.get("state", graph.new_chat())
         state["language"] = language
         context.user_data["state"] = state
 
@@ -107,7 +118,8 @@ Do not add any extra text or explanations.
 Text to translate:
 {confirmation_text_en}|||{welcome_text_en_template}
 """
-            response = await llm.ainvoke(prompt)
+            response = await graph.get_llm().ainvoke(prompt)
+            quota.record_usage(chat_id, response.usage_metadata)
             translations = response.content.split("|||")
             if len(translations) == 2:
                 confirmation_text = translations[0].strip()
@@ -258,37 +270,66 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         "1. /start - Start the bot.\n"
         "2. /language - Switch to a different language.\n"
         "3. /clear - Reset our conversation history.\n"
-        "4. /help - Show this help message again.\n"
-        "5. /cancel - Stop the language change operation."
+        "4. /usage - Show your usage and remaining quota.\n"
+        "5. /help - Show this help message again.\n"
+        "6. /cancel - Stop the language change operation."
     )
     await update.message.reply_text(help_text, parse_mode=None)
     storage.store_bot_response(update.effective_chat.id, help_text)
 
 
+async def usage_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Sends the chat's usage, estimated cost and remaining quota."""
+    chat_id = update.effective_chat.id
+    text = quota.usage_report(chat_id)
+    await update.message.reply_text(text, parse_mode=None)
+    storage.store_bot_response(chat_id, text)
+
+
+async def reply_quota_exceeded(update: Update, wait_seconds: float) -> None:
+    """Tells the user they have reached their usage limit and when to try again."""
+    if math.isinf(wait_seconds):
+        retry_text = "Please try again later."
+    else:
+        minutes = max(1, round(wait_seconds / 60))
+        retry_text = f"Please try again in about {minutes} minute{'s' if minutes != 1 else ''}."
+    text = (
+        "You've reached your usage limit for now. ⏳\n\n"
+        f"{retry_text} You can check your usage with /usage."
+    )
+    await update.message.reply_text(text)
+    storage.store_bot_response(update.effective_chat.id, text)
+
+
 async def clear_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Clears the conversation history, keeping the current language setting."""
+    import graph
+
     language = context.user_data.get("language")
     chat_id = update.effective_chat.id
     context.user_data.clear()
 
     if language:
         context.user_data["language"] = language
-        state = new_chat()
+        state = graph.new_chat()
         state["language"] = language
         context.user_data["state"] = state
 
         confirmation_text_en_template = "Done! Our conversation history has been cleared. I'm ready for new questions in {language}."
 
-        try:
-            prompt = f"You are a translation assistant. Translate the following text to {language}. Preserve the `{{language}}` placeholder. Do not add any extra text or explanations.\n\nText to translate:\n{confirmation_text_en_template}"
-            response = await llm.ainvoke(prompt)
-            translated_template = response.content.strip()
-            confirmation_text = translated_template.replace("{language}", language)
-        except Exception as e:
-            logging.error(f"Failed to generate translated clear message: {e}")
-            confirmation_text = confirmation_text_en_template.replace(
-                "{language}", language
-            )
+        confirmation_text = confirmation_text_en_template.replace(
+            "{language}", language
+        )
+        # The history is cleared either way; only the translation needs quota.
+        if not quota.acquire(chat_id):
+            try:
+                prompt = f"You are a translation assistant. Translate the following text to {language}. Preserve the `{{language}}` placeholder. Do not add any extra text or explanations.\n\nText to translate:\n{confirmation_text_en_template}"
+                response = await graph.get_llm().ainvoke(prompt)
+                quota.record_usage(chat_id, response.usage_metadata)
+                translated_template = response.content.strip()
+                confirmation_text = translated_template.replace("{language}", language)
+            except Exception as e:
+                logging.error(f"Failed to generate translated clear message: {e}")
 
         await update.message.reply_text(confirmation_text)
         storage.store_bot_response(chat_id, confirmation_text)
@@ -312,8 +353,16 @@ async def _process_image(
     A helper function that handles the logic for processing an image.
     This includes downloading the file, calling the graph, and sending the response.
     """
+    import graph
+
     chat_id = update.message.chat_id
     user = update.effective_user
+
+    wait_seconds = quota.acquire(chat_id)
+    if wait_seconds:
+        await reply_quota_exceeded(update, wait_seconds)
+        return
+
     thinking_text = "Analyzing your image... 🔬"
     thinking_message = await context.bot.send_message(chat_id, thinking_text)
     storage.store_bot_response(chat_id, thinking_text)
@@ -336,7 +385,7 @@ async def _process_image(
         with open(image_path, "rb") as f:
             image_bytes = f.read()
 
-        state = context.user_data.get("state", new_chat())
+        state = context.user_data.get("state", graph.new_chat())
 
         report_id = context.user_data.get("report_id", 0) + 1
         context.user_data["report_id"] = report_id
@@ -350,7 +399,12 @@ async def _process_image(
             "report_id": report_id,
         }
 
-        final_state = app.invoke(inputs)
+        final_state = graph.get_app().invoke(inputs)
+        if (
+            not final_state.get("cache_hit")
+            and final_state.get("generation") != graph.ERROR_GENERATION
+        ):
+            quota.record_usage(chat_id, final_state.get("usage"))
         context.user_data["state"] = final_state
         final_answer = final_state.get(
             "generation", "Sorry, I couldn't analyze the image."
@@ -369,7 +423,7 @@ async def _process_image(
 
             if language:
                 context.user_data["language"] = language
-                state = new_chat()
+                state = graph.new_chat()
                 state["language"] = language
                 context.user_data["state"] = state
 
@@ -377,7 +431,8 @@ async def _process_image(
                 reset_message = reset_message_en
                 try:
                     prompt = f"You are a translation assistant. Translate the following text to {language}. Do not add any extra text or explanations.\n\nText to translate:\n{reset_message_en}"
-                    response = await llm.ainvoke(prompt)
+                    response = await graph.get_llm().ainvoke(prompt)
+                    quota.record_usage(chat_id, response.usage_metadata)
                     reset_message = response.content.strip()
                 except Exception as e:
                     logging.error(f"Failed to generate translated reset message: {e}")
@@ -451,6 +506,8 @@ async def handle_file(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
 
 async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handles text messages for follow-up questions or general queries."""
+    import graph
+
     chat_id = update.effective_chat.id
     if "language" not in context.user_data:
         text = (
@@ -465,12 +522,17 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
     question = update.message.text
     storage.store_message(chat_id, user.full_name, question)
 
+    wait_seconds = quota.acquire(chat_id)
+    if wait_seconds:
+        await reply_quota_exceeded(update, wait_seconds)
+        return
+
     thinking_text = "Thinking... 🧠"
     thinking_message = await context.bot.send_message(chat_id, thinking_text)
     storage.store_bot_response(chat_id, thinking_text)
 
     try:
-        state = context.user_data.get("state", new_chat())
+        state = context.user_data.get("state", graph.new_chat())
         report_id = context.user_data.get("report_id", 0)
         inputs = {
             "chat_history": state.get("chat_history", []),
@@ -478,7 +540,12 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
             "language": context.user_data["language"],
             "report_id": report_id,
         }
-        final_state = app.invoke(inputs)
+        final_state = graph.get_app().invoke(inputs)
+        if (
+            not final_state.get("cache_hit")
+            and final_state.get("generation") != graph.ERROR_GENERATION
+        ):
+            quota.record_usage(chat_id, final_state.get("usage"))
         context.user_data["state"] = final_state
         final_answer = final_state.get(
             "generation", "Sorry, I couldn't process your request."
@@ -499,14 +566,40 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
         storage.store_bot_response(chat_id, error_text)
 
 
+async def warm_up(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Loads the graph in the background once the bot is running, so that commands
+    like /help are answered while the model client is still initializing.
+    """
+
+    def _load_graph():
+        import graph
+
+        graph.warm_up()
+
+    async def _warm_up():
+        try:
+            await asyncio.to_thread(_load_graph)
+            logging.info("Graph warm-up finished.")
+        except Exception as e:
+            logging.error(f"Graph warm-up failed: {e}")
+
+    context.application.create_task(_warm_up(), name="graph_warm_up")
+
+
 def main() -> None:
     """Starts the bot."""
     logging.info("Starting bot...")
     if not TELEGRAM_BOT_TOKEN:
         logging.error("TELEGRAM_BOT_TOKEN not found in environment variables.")
         return
+    if not GEMINI_MODEL:
+        logging.error("GEMINI_MODEL not found in environment variables.")
+        return
 
     application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+    # Jobs start running together with the application, i.e. once polling has started.
+    application.job_queue.run_once(warm_up, when=0)
 
     conv_handler = ConversationHandler(
         entry_points=[
@@ -532,6 +625,7 @@ def main() -> None:
     application.add_handler(conv_handler)
     application.add_handler(CommandHandler("help", help_command))
     application.add_handler(CommandHandler("clear", clear_command))
+    application.add_handler(CommandHandler("usage", usage_command))
     application.add_handler(MessageHandler(filters.PHOTO, handle_photo))
     application.add_handler(MessageHandler(filters.Document.ALL, handle_file))
     application.add_handler(
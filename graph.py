@@ -1,31 +1,103 @@
 import os
 import logging
 import base64
+import threading
 from dotenv import load_dotenv
 from typing import List, TypedDict, Optional
 
-from langgraph.graph import StateGraph, END
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
+
+from retrieval import KnowledgeIndex
+from answer_cache import AnswerCache
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 
 load_dotenv()
 
 GEMINI_MODEL = os.getenv("GEMINI_MODEL")
-if not GEMINI_MODEL:
-    raise ValueError("GEMINI_MODEL environment variable not set.")
+KNOWLEDGE_TOP_K = int(os.getenv("KNOWLEDGE_TOP_K", "3"))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "256"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.9"))
+
+_llm = None
+_app = None
+_system_prompt = None
+_knowledge_index = None
+_init_lock = threading.Lock()
+
+
+def get_llm():
+    """
+    Returns the shared Gemini client, creating it on first use.
+    The client library is imported here as it is slow to load.
+    """
+    global _llm
+    if _llm is None:
+        with _init_lock:
+            if _llm is None:
+                if not GEMINI_MODEL:
+                    raise ValueError("GEMINI_MODEL environment variable not set.")
+                from langchain_google_genai import ChatGoogleGenerativeAI
+
+                _llm = ChatGoogleGenerativeAI(model=GEMINI_MODEL, temperature=0)
+                logging.info("Gemini client initialized.")
+    return _llm
+
 
-llm = ChatGoogleGenerativeAI(model=GEMINI_MODEL, temperature=0)
+def set_llm(llm):
+    """Replaces the shared model client, e.g. with a stand-in for benchmarks."""
+    global _llm
+    _llm = llm
 
-try:
-    prompt_path = os.path.join(os.path.dirname(__file__), "prompt.txt")
-    with open(prompt_path, "r") as f:
-        SYSTEM_PROMPT = f.read()
-    logging.info("Successfully loaded the system prompt.")
-except FileNotFoundError:
-    logging.error(f"System prompt file not found at: {prompt_path}")
-    raise
+
+def get_system_prompt() -> str:
+    """Returns the system prompt, reading it from prompt.txt on first use."""
+    global _system_prompt
+    if _system_prompt is None:
+        with _init_lock:
+            if _system_prompt is None:
+                prompt_path = os.path.join(os.path.dirname(__file__), "prompt.txt")
+                try:
+                    with open(prompt_path, "r") as f:
+                        _system_prompt = f.read()
+                    logging.info("Successfully loaded the system prompt.")
+                except FileNotFoundError:
+                    logging.error(f"System prompt file not found at: {prompt_path}")
+                    raise
+    return _system_prompt
+
+
+def get_knowledge_index() -> KnowledgeIndex:
+    """Returns the knowledge base index, building it on first use."""
+    global _knowledge_index
+    if _knowledge_index is None:
+        with _init_lock:
+            if _knowledge_index is None:
+                knowledge_base_path = os.path.join(
+                    os.path.dirname(__file__), "knowledge_base.txt"
+                )
+                try:
+                    with open(knowledge_base_path, "r") as f:
+                        _knowledge_index = KnowledgeIndex(f.read())
+                    logging.info(
+                        f"Indexed {len(_knowledge_index.sections)} knowledge base sections."
+                    )
+                except FileNotFoundError:
+                    logging.error(
+                        f"Knowledge base file not found at: {knowledge_base_path}"
+                    )
+                    raise
+    return _knowledge_index
+
+
+answer_cache = AnswerCache(
+    max_size=ANSWER_CACHE_SIZE,
+    ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+    threshold=ANSWER_CACHE_THRESHOLD,
+)
+
+ERROR_GENERATION = "Sorry, I encountered an error while processing your request. Please try again."
 
 
 class GraphState(TypedDict):
@@ -40,6 +112,8 @@ class GraphState(TypedDict):
         image_mime_type: The MIME type of the image.
         language: The language for the response.
         report_id: The incremental ID for the report.
+        cache_hit: Whether the generation was served from the answer cache.
+        usage: The token usage metadata of the model call, if one was made.
     """
 
     chat_history: List[BaseMessage]
@@ -49,6 +123,58 @@ class GraphState(TypedDict):
     image_mime_type: Optional[str]
     language: str
     report_id: Optional[int]
+    cache_hit: bool
+    usage: Optional[dict]
+
+
+def is_context_free(state: GraphState) -> bool:
+    """
+    Returns True if the turn is a text question that opens the conversation,
+    with no report in the session, so its answer does not depend on anything
+    the user sent before.
+    """
+    return bool(
+        state.get("question")
+        and not state.get("image_bytes")
+        and not state.get("report_id")
+        and not state.get("chat_history")
+    )
+
+
+def lookup_cache(state: GraphState) -> dict:
+    """
+    Serves context-free questions from the answer cache when a similar
+    question was already answered in the same language.
+
+    Args:
+        state: The current state of the graph.
+
+    Returns:
+        A dictionary with the updated state.
+    """
+    if not is_context_free(state):
+        return {"cache_hit": False, "usage": None}
+
+    question = state["question"]
+    language = state.get("language", "English")
+    generation = answer_cache.get(question, language)
+    if generation is None:
+        return {"cache_hit": False, "usage": None}
+
+    logging.info("Serving response from the answer cache.")
+    chat_history = state.get("chat_history", [])
+    return {
+        "generation": generation,
+        "chat_history": chat_history
+        + [HumanMessage(content=question), AIMessage(content=generation)],
+        "cache_hit": True,
+        "usage": None,
+    }
+
+
+def route_after_cache(state: GraphState) -> str:
+    """Skips generation when the answer was served from the cache."""
+    return "hit" if state.get("cache_hit") else "miss"
 
 
 def generate_response(state: GraphState) -> dict:
@@ -69,7 +195,19 @@ def generate_response(state: GraphState) -> dict:
     language = state.get("language", "English")
     report_id = state.get("report_id")
 
-    system_prompt = SYSTEM_PROMPT
+    knowledge_index = get_knowledge_index()
+    if image_bytes and image_mime_type:
+        knowledge_base = knowledge_index.full_text
+    else:
+        last_answer = next(
+            (m.content for m in reversed(chat_history) if isinstance(m, AIMessage)),
+            "",
+        )
+        knowledge_base = knowledge_index.select(
+            question, KNOWLEDGE_TOP_K, context=last_answer
+        )
+
+    system_prompt = get_system_prompt()
     if report_id is not None:
         formatted_report_id = f"{report_id:02d}"
         system_prompt = system_prompt.replace("{report_id}", formatted_report_id)
@@ -77,18 +215,25 @@ def generate_response(state: GraphState) -> dict:
     language_instruction = f"IMPORTANT: You must provide your answer in {language}."
     final_system_prompt = f"{language_instruction}\n\n{system_prompt}"
 
+    # The knowledge base goes with the current message rather than the system
+    # prompt, so the system prompt and chat history stay a stable prefix
+    # across turns. Only the bare question is kept in the history.
+    question_with_knowledge = (
+        f"KNOWLEDGE BASE:\n{knowledge_base}\n\nUSER MESSAGE:\n{question}"
+    )
+
     if image_bytes and image_mime_type:
         logging.info(f"Image detected (MIME type: {image_mime_type})")
         base64_image = base64.b64encode(image_bytes).decode("utf-8")
         user_message_content = [
-            question,
+            question_with_knowledge,
             {
                 "type": "image_url",
                 "image_url": f"data:{image_mime_type};base64,{base64_image}",
             },
         ]
     else:
-        user_message_content = question
+        user_message_content = question_with_knowledge
 
     messages = [
         SystemMessage(content=final_system_prompt),
@@ -96,13 +241,15 @@ def generate_response(state: GraphState) -> dict:
         HumanMessage(content=user_message_content),
     ]
 
+    usage = None
     try:
-        response = llm.invoke(messages)
+        response = get_llm().invoke(messages)
         generation = response.content
+        usage = getattr(response, "usage_metadata", None)
         logging.info("Successfully generated response from the model.")
     except Exception as e:
         logging.error(f"Error during model invocation: {e}")
-        generation = "Sorry, I encountered an error while processing your request. Please try again."
+        generation = ERROR_GENERATION
 
     human_message_for_history = question
     if image_bytes:
@@ -124,9 +271,34 @@ def generate_response(state: GraphState) -> dict:
         "image_mime_type": None,
         "language": language,
         "report_id": report_id,
+        "cache_hit": False,
+        "usage": usage,
     }
 
 
+def store_answer(state: GraphState) -> dict:
+    """
+    Caches the answer to a context-free question, i.e. one asked at the start
+    of a conversation, so that it was not shaped by earlier messages.
+
+    Args:
+        state: The current state of the graph.
+
+    Returns:
+        An empty dictionary, as the state is not changed.
+    """
+    generation = state.get("generation")
+    # The history already includes this turn's question and answer.
+    state_before_turn = {**state, "chat_history": state.get("chat_history", [])[:-2]}
+    if (
+        is_context_free(state_before_turn)
+        and generation
+        and generation != ERROR_GENERATION
+    ):
+        answer_cache.put(state["question"], state.get("language", "English"), generation)
+    return {}
+
+
 def new_chat() -> GraphState:
     """
     Returns an empty state to start a new conversation.
@@ -139,12 +311,45 @@ def new_chat() -> GraphState:
         "image_mime_type": None,
         "language": "English",
         "report_id": None,
+        "cache_hit": False,
+        "usage": None,
     }
 
 
-workflow = StateGraph(GraphState)
-workflow.add_node("generate", generate_response)
-workflow.set_entry_point("generate")
-workflow.add_edge("generate", END)
-app = workflow.compile()
-logging.info("Graph compiled successfully.")
+def get_app():
+    """
+    Returns the compiled graph, building it on first use.
+    langgraph is imported here as it is slow to load.
+    """
+    global _app
+    if _app is None:
+        with _init_lock:
+            if _app is None:
+                from langgraph.graph import StateGraph, END
+
+                workflow = StateGraph(GraphState)
+                workflow.add_node("lookup_cache", lookup_cache)
+                workflow.add_node("generate", generate_response)
+                workflow.add_node("store_answer", store_answer)
+                workflow.set_entry_point("lookup_cache")
+                workflow.add_conditional_edges(
+                    "lookup_cache",
+                    route_after_cache,
+                    {"hit": END, "miss": "generate"},
+                )
+                workflow.add_edge("generate", "store_answer")
+                workflow.add_edge("store_answer", END)
+                _app = workflow.compile()
+                logging.info("Graph compiled successfully.")
+    return _app
+
+
+def warm_up():
+    """
+    Loads the prompt, knowledge base, model client and compiled graph ahead of
+    the first request. Safe to call from a background thread.
+    """
+    get_system_prompt()
+    get_knowledge_index()
+    get_llm()
+    get_app()
@@ -0,0 +1,204 @@
+import os
+import json
+import time
+import logging
+import threading
+
+import storage
+
+QUOTA_FILENAME = "quota.json"
+
+
+def burst_setting(name: str, default: str) -> float:
+    """
+    Reads a bucket size from the environment. A burst of 0 disables the
+    corresponding limit; values between 0 and 1 could never allow a request,
+    so they are raised to 1.
+    """
+    value = float(os.getenv(name, default))
+    if value <= 0:
+        return 0.0
+    if value < 1:
+        logging.warning(f"{name}={value} can never allow a request, using 1 instead.")
+        return 1.0
+    return value
+
+
+REQUEST_BURST = burst_setting("QUOTA_REQUEST_BURST", "20")
+REQUEST_REFILL_PER_HOUR = float(os.getenv("QUOTA_REQUEST_REFILL_PER_HOUR", "30"))
+TOKEN_BURST = burst_setting("QUOTA_TOKEN_BURST", "200000")
+TOKEN_REFILL_PER_HOUR = float(os.getenv("QUOTA_TOKEN_REFILL_PER_HOUR", "300000"))
+
+# Prices in USD per million tokens, used for the cost report.
+INPUT_COST_PER_MILLION = float(os.getenv("QUOTA_INPUT_COST_PER_MILLION", "0.30"))
+OUTPUT_COST_PER_MILLION = float(os.getenv("QUOTA_OUTPUT_COST_PER_MILLION", "2.50"))
+
+_quotas: dict[int, dict] = {}
+_lock = threading.Lock()
+
+
+def _new_quota(now: float) -> dict:
+    """Returns the quota record of a chat that has not used the bot yet."""
+    return {
+        "request_bucket": REQUEST_BURST,
+        "token_bucket": TOKEN_BURST,
+        "updated_at": now,
+        "usage": {
+            "requests": 0,
+            "llm_calls": 0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+        },
+        "since": now,
+    }
+
+
+def _load(chat_id: int) -> dict:
+    """Returns the quota record of a chat, reading it from disk on first use."""
+    if chat_id in _quotas:
+        return _quotas[chat_id]
+    quota_path = os.path.join(storage.get_chat_storage_path(chat_id), QUOTA_FILENAME)
+    quota = None
+    if os.path.exists(quota_path):
+        try:
+            with open(quota_path, "r", encoding="utf-8") as f:
+                quota = json.load(f)
+        except Exception as e:
+            logging.error(f"Failed to read quota file {quota_path}: {e}")
+    if quota is None:
+        quota = _new_quota(time.time())
+    _quotas[chat_id] = quota
+    return quota
+
+
+def _save(chat_id: int, quota: dict):
+    """Writes the quota record of a chat to disk."""
+    storage.setup_storage(chat_id)
+    quota_path = os.path.join(storage.get_chat_storage_path(chat_id), QUOTA_FILENAME)
+    tmp_path = f"{quota_path}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(quota, f)
+        os.replace(tmp_path, quota_path)
+    except Exception as e:
+        logging.error(f"Failed to write quota file {quota_path}: {e}")
+
+
+def _refill(quota: dict, now: float):
+    """Adds the tokens accrued since the last update to both buckets."""
+    hours = max(0.0, now - quota["updated_at"]) / 3600
+    quota["request_bucket"] = min(
+        REQUEST_BURST, quota["request_bucket"] + hours * REQUEST_REFILL_PER_HOUR
+    )
+    quota["token_bucket"] = min(
+        TOKEN_BURST, quota["token_bucket"] + hours * TOKEN_REFILL_PER_HOUR
+    )
+    quota["updated_at"] = now
+
+
+def _seconds_until(level: float, target: float, refill_per_hour: float) -> float:
+    """Returns how long a bucket at `level` takes to refill to `target`."""
+    if level >= target:
+        return 0.0
+    if refill_per_hour <= 0:
+        return float("inf")
+    return (target - level) / refill_per_hour * 3600
+
+
+def acquire(chat_id: int) -> float:
+    """
+    Takes one request from the chat's request bucket if both buckets allow it.
+
+    The token bucket only needs to be positive, as the size of a request is
+    not known until the model has answered.
+
+    Returns:
+        0 if the request is allowed, otherwise the number of seconds until it would be.
+    """
+    with _lock:
+        quota = _load(chat_id)
+        _refill(quota, time.time())
+
+        wait = 0.0
+        if REQUEST_BURST > 0:
+            wait = max(
+                wait,
+                _seconds_until(quota["request_bucket"], 1, REQUEST_REFILL_PER_HOUR),
+            )
+        if TOKEN_BURST > 0 and quota["token_bucket"] <= 0:
+            wait = max(
+                wait,
+                _seconds_until(quota["token_bucket"], 1, TOKEN_REFILL_PER_HOUR),
+            )
+        if wait > 0:
+            _save(chat_id, quota)
+            return wait
+
+        if REQUEST_BURST > 0:
+            quota["request_bucket"] -= 1
+        quota["usage"]["requests"] += 1
+        _save(chat_id, quota)
+        return 0.0
+
+
+def record_usage(chat_id: int, usage: dict | None):
+    """
+    Records the token usage of a model call and takes the tokens from the
+    chat's token bucket, which may leave it negative.
+
+    Args:
+        chat_id: The chat the call was made for.
+        usage: The usage metadata of the model response, with `input_tokens`
+            and `output_tokens`. Calls without metadata are counted without tokens.
+    """
+    usage = usage or {}
+    input_tokens = usage.get("input_tokens", 0)
+    output_tokens = usage.get("output_tokens", 0)
+    total_tokens = usage.get("total_tokens", input_tokens + output_tokens)
+    with _lock:
+        quota = _load(chat_id)
+        _refill(quota, time.time())
+        if TOKEN_BURST > 0:
+            quota["token_bucket"] -= total_tokens
+        quota["usage"]["llm_calls"] += 1
+        quota["usage"]["input_tokens"] += input_tokens
+        quota["usage"]["output_tokens"] += output_tokens
+        _save(chat_id, quota)
+
+
+def estimate_cost(usage: dict) -> float:
+    """Returns the estimated cost in USD of the recorded token usage."""
+    return (
+        usage["input_tokens"] * INPUT_COST_PER_MILLION
+        + usage["output_tokens"] * OUTPUT_COST_PER_MILLION
+    ) / 1_000_000
+
+
+def usage_report(chat_id: int) -> str:
+    """Returns a plain-text report of the chat's usage, estimated cost and remaining quota."""
+    with _lock:
+        quota = _load(chat_id)
+        _refill(quota, time.time())
+        usage = dict(quota["usage"])
+        request_bucket = quota["request_bucket"]
+        token_bucket = quota["token_bucket"]
+        since = quota["since"]
+
+    since_text = time.strftime("%Y-%m-%d", time.localtime(since))
+    lines = [
+        f"Usage since {since_text}:",
+        f"Requests: {usage['requests']}",
+        f"Model calls: {usage['llm_calls']}",
+        f"Input tokens: {usage['input_tokens']:,}",
+        f"Output tokens: {usage['output_tokens']:,}",
+        f"Estimated cost: ${estimate_cost(usage):.4f}",
+    ]
+    if REQUEST_BURST > 0:
+        lines.append(
+            f"Requests available now: {int(max(0, request_bucket))} of {int(REQUEST_BURST)}"
+        )
+    if TOKEN_BURST > 0:
+        lines.append(
+            f"Tokens available now: {int(max(0, token_bucket)):,} of {int(TOKEN_BURST):,}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,153 @@
+import re
+import math
+from collections import Counter
+from typing import List, NamedTuple
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "can", "do", "does",
+    "for", "from", "how", "i", "if", "in", "is", "it", "its", "me", "my", "of",
+    "on", "or", "should", "so", "that", "the", "their", "them", "there", "these",
+    "this", "to", "was", "what", "when", "where", "which", "who", "why", "will",
+    "with", "you", "your",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercases text and splits it into word tokens, dropping stopwords and plural endings."""
+    tokens = []
+    for token in re.findall(r"\w+", text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class KnowledgeSection(NamedTuple):
+    """A single knowledge base entry and the category heading it belongs to."""
+
+    category: str
+    text: str
+
+
+def parse_sections(knowledge_base: str) -> List[KnowledgeSection]:
+    """
+    Splits the knowledge base into one section per top-level bullet.
+
+    Args:
+        knowledge_base: Text made of '### Category' headings, each followed by
+            entries that start with a '*' bullet at the beginning of a line.
+
+    Returns:
+        The sections in the order they appear in the knowledge base.
+    """
+    sections = []
+    category = ""
+    current: List[str] = []
+
+    def flush():
+        if current:
+            sections.append(KnowledgeSection(category, "\n".join(current).strip()))
+            current.clear()
+
+    for line in knowledge_base.splitlines():
+        if line.startswith("###"):
+            flush()
+            category = line.strip()
+        elif line.startswith("*"):
+            flush()
+            current.append(line)
+        elif current:
+            current.append(line)
+    flush()
+    return sections
+
+
+class KnowledgeIndex:
+    """
+    A BM25 index over the knowledge base sections, built once at startup.
+    Used to select only the sections relevant to a text question.
+    """
+
+    def __init__(self, knowledge_base: str, k1: float = 1.5, b: float = 0.75):
+        self.full_text = knowledge_base.strip()
+        self.sections = parse_sections(knowledge_base)
+        self.k1 = k1
+        self.b = b
+
+        self._term_counts = [
+            Counter(tokenize(f"{section.category}\n{section.text}"))
+            for section in self.sections
+        ]
+        self._lengths = [sum(counts.values()) for counts in self._term_counts]
+        self._avg_length = (
+            sum(self._lengths) / len(self._lengths) if self._lengths else 0.0
+        )
+
+        document_frequency = Counter()
+        for counts in self._term_counts:
+            document_frequency.update(counts.keys())
+        total = len(self.sections)
+        self._idf = {
+            term: math.log(1 + (total - freq + 0.5) / (freq + 0.5))
+            for term, freq in document_frequency.items()
+        }
+
+    def score(self, query: str) -> List[float]:
+        """Returns the BM25 score of every section for the query."""
+        terms = set(tokenize(query))
+        scores = []
+        for counts, length in zip(self._term_counts, self._lengths):
+            score = 0.0
+            for term in terms:
+                tf = counts.get(term)
+                if not tf:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * length / self._avg_length)
+                score += self._idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            scores.append(score)
+        return scores
+
+    def select(self, question: str, top_k: int, context: str = "") -> str:
+        """
+        Returns the top_k sections most relevant to the question, grouped under
+        their category headings in knowledge base order.
+
+        Sections matching the question always come first. The context (e.g. the
+        last report) only breaks ties between them and fills the slots the
+        question leaves empty, so a long report cannot crowd out the section the
+        user asked about.
+
+        Falls back to the full knowledge base when no section matches, e.g. when
+        the question is in a language the index has no vocabulary for.
+        """
+        question_scores = self.score(question)
+        context_scores = self.score(context) if context else [0.0] * len(self.sections)
+        ranked = sorted(
+            range(len(self.sections)),
+            key=lambda i: (question_scores[i], context_scores[i]),
+            reverse=True,
+        )
+        selected = [i for i in ranked if question_scores[i] > 0][:top_k]
+        by_context = sorted(
+            range(len(self.sections)), key=lambda i: context_scores[i], reverse=True
+        )
+        for i in by_context:
+            if len(selected) >= top_k:
+                break
+            if context_scores[i] > 0 and i not in selected:
+                selected.append(i)
+        selected.sort()
+        if not selected:
+            return self.full_text
+
+        parts = []
+        category = None
+        for i in selected:
+            section = self.sections[i]
+            if section.category != category:
+                category = section.category
+                parts.append(category)
+            parts.append(section.text)
+        return "\n\n".join(parts)
@@ -0,0 +1,90 @@
+import pytest
+from langchain_core.messages import AIMessage
+
+import graph
+from answer_cache import AnswerCache
+
+
+class StubLLM:
+    """Answers every question with a numbered reply so calls can be told apart."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        return AIMessage(content=f"answer {self.calls}")
+
+
+@pytest.fixture
+def stub_llm(monkeypatch):
+    llm = StubLLM()
+    monkeypatch.setattr(graph, "_llm", llm)
+    monkeypatch.setattr(graph, "answer_cache", AnswerCache())
+    return llm
+
+
+def ask(question, chat_history=None, report_id=0, language="English"):
+    inputs = graph.new_chat()
+    inputs.update(
+        {
+            "chat_history": chat_history or [],
+            "question": question,
+            "language": language,
+            "report_id": report_id,
+        }
+    )
+    return graph.get_app().invoke(inputs)
+
+
+def test_repeated_opening_question_is_served_from_cache(stub_llm):
+    first = ask("What is rice blast?")
+    second = ask("what is the rice blast")
+
+    assert not first["cache_hit"]
+    assert second["cache_hit"]
+    assert second["generation"] == first["generation"]
+    assert stub_llm.calls == 1
+
+
+def test_question_word_is_part_of_the_key(stub_llm):
+    ask("How do I apply fertilizer?")
+    when = ask("When should I apply fertilizer?")
+
+    assert not when["cache_hit"]
+    assert when["generation"] == "answer 2"
+
+
+def test_negation_is_part_of_the_key(stub_llm):
+    ask("Is rice blast contagious?")
+
+    assert not ask("Is rice blast not contagious?")["cache_hit"]
+
+
+def test_follow_up_question_bypasses_cache(stub_llm):
+    ask("How should I treat them?")
+
+    opening = ask("What are leafhoppers?")
+    follow_up = ask("how should i treat them", chat_history=opening["chat_history"])
+
+    assert not follow_up["cache_hit"]
+    assert follow_up["generation"] == "answer 3"
+
+
+def test_follow_up_answer_is_not_cached(stub_llm):
+    opening = ask("What are leafhoppers?")
+    ask("How should I treat them?", chat_history=opening["chat_history"])
+
+    assert not ask("How should I treat them?")["cache_hit"]
+
+
+def test_session_with_report_bypasses_cache(stub_llm):
+    ask("What is rice blast?")
+
+    assert not ask("What is rice blast?", report_id=1)["cache_hit"]
+
+
+def test_cache_is_per_language(stub_llm):
+    ask("What is rice blast?")
+
+    assert not ask("What is rice blast?", language="Khmer")["cache_hit"]
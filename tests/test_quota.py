@@ -0,0 +1,130 @@
+import json
+import os
+
+import pytest
+
+import quota
+import storage
+
+
+class Clock:
+    """A frozen clock that only moves when a test advances it."""
+
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch, tmp_path):
+    clock = Clock()
+    monkeypatch.setattr(storage, "STORAGE_DIR", str(tmp_path))
+    monkeypatch.setattr(quota.time, "time", clock)
+    monkeypatch.setattr(quota, "REQUEST_BURST", 2.0)
+    monkeypatch.setattr(quota, "REQUEST_REFILL_PER_HOUR", 30.0)
+    monkeypatch.setattr(quota, "TOKEN_BURST", 1000.0)
+    monkeypatch.setattr(quota, "TOKEN_REFILL_PER_HOUR", 3600.0)
+    monkeypatch.setattr(quota, "_quotas", {})
+    return clock
+
+
+def test_burst_is_exhausted(clock):
+    assert quota.acquire(1) == 0
+    assert quota.acquire(1) == 0
+    # One request refills every 120 seconds at 30 per hour.
+    assert quota.acquire(1) == pytest.approx(120)
+
+
+def test_chats_have_separate_buckets(clock):
+    quota.acquire(1)
+    quota.acquire(1)
+
+    assert quota.acquire(2) == 0
+
+
+def test_bucket_refills_over_time(clock):
+    quota.acquire(1)
+    quota.acquire(1)
+
+    clock.advance(60)
+    assert quota.acquire(1) == pytest.approx(60)
+
+    clock.advance(60)
+    assert quota.acquire(1) == 0
+
+
+def test_refill_is_capped_at_burst(clock):
+    quota.acquire(1)
+    clock.advance(24 * 3600)
+
+    assert quota.acquire(1) == 0
+    assert quota.acquire(1) == 0
+    assert quota.acquire(1) > 0
+
+
+def test_negative_token_bucket_blocks_next_request(clock):
+    assert quota.acquire(1) == 0
+    quota.record_usage(
+        1, {"input_tokens": 1000, "output_tokens": 200, "total_tokens": 1200}
+    )
+
+    # 201 tokens are missing to get back to 1, at one token per second.
+    assert quota.acquire(1) == pytest.approx(201)
+
+    clock.advance(201)
+    assert quota.acquire(1) == 0
+
+
+def test_usage_is_counted(clock):
+    quota.acquire(1)
+    quota.record_usage(1, {"input_tokens": 10, "output_tokens": 5, "total_tokens": 15})
+
+    report = quota.usage_report(1)
+    assert "Requests: 1" in report
+    assert "Model calls: 1" in report
+    assert "Input tokens: 10" in report
+    assert "Output tokens: 5" in report
+
+
+def test_counters_survive_restart(clock, tmp_path):
+    quota.acquire(1)
+    quota.record_usage(1, {"input_tokens": 10, "output_tokens": 5, "total_tokens": 15})
+
+    with open(os.path.join(tmp_path, "1", quota.QUOTA_FILENAME)) as f:
+        saved = json.load(f)
+    assert saved["usage"]["requests"] == 1
+
+    quota._quotas.clear()
+
+    assert quota.acquire(1) == 0
+    assert quota.acquire(1) == pytest.approx(120)
+    assert "Requests: 2" in quota.usage_report(1)
+    assert "Input tokens: 10" in quota.usage_report(1)
+
+
+def test_zero_burst_disables_limit(clock, monkeypatch):
+    monkeypatch.setattr(quota, "REQUEST_BURST", 0.0)
+    monkeypatch.setattr(quota, "TOKEN_BURST", 0.0)
+    monkeypatch.setattr(quota, "_quotas", {})
+
+    for _ in range(10):
+        assert quota.acquire(1) == 0
+        quota.record_usage(1, {"input_tokens": 5000, "output_tokens": 5000})
+
+    report = quota.usage_report(1)
+    assert "Requests: 10" in report
+    assert "available now" not in report
+
+
+@pytest.mark.parametrize(
+    "value, expected", [("0", 0.0), ("-3", 0.0), ("0.5", 1.0), ("1", 1.0), ("20", 20.0)]
+)
+def test_burst_setting_clamps_values_below_one(monkeypatch, value, expected):
+    monkeypatch.setenv("QUOTA_TEST_BURST", value)
+
+    assert quota.burst_setting("QUOTA_TEST_BURST", "20") == expected
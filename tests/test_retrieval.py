@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+from retrieval import KnowledgeIndex
+
+KNOWLEDGE_BASE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "knowledge_base.txt"
+)
+
+BROWN_SPOT_REPORT = """🌾 RIDA - Rice Disease AI Assistant Report
+Report ID: 01
+
+1. DIAGNOSIS
+
+*   Primary Diagnosis: Brown Spot (Bipolaris oryzae)
+*   Confidence Level: High
+*   Key Visual Evidence: Numerous small, oval brown spots on the leaf blade,
+    smaller and more uniform than blast lesions, without a gray center.
+*   Alternative Diagnoses: Rice Blast
+
+2. ABOUT THE ISSUE
+
+*   Causative Agent: Fungus: Bipolaris oryzae.
+*   Description: Brown spot is a fungal disease of the leaves and glumes that
+    often indicates plant stress from poor soil fertility."""
+
+
+@pytest.fixture(scope="module")
+def index():
+    with open(KNOWLEDGE_BASE_PATH, "r") as f:
+        return KnowledgeIndex(f.read())
+
+
+def selected_names(text):
+    return [line for line in text.splitlines() if line.startswith("*   ")]
+
+
+def test_question_selects_matching_section(index):
+    selected = index.select("How do I treat brown spot?", 1)
+
+    assert "**Brown Spot**" in selected
+    assert len(selected_names(selected)) == 1
+
+
+def test_follow_up_question_outranks_previous_report(index):
+    selected = index.select("what about stem rot?", 3, context=BROWN_SPOT_REPORT)
+
+    assert "**Stem Rot**" in selected
+
+
+def test_report_fills_slots_question_does_not_match(index):
+    selected = index.select("how should I treat it?", 2, context=BROWN_SPOT_REPORT)
+
+    assert "**Brown Spot**" in selected
+    assert len(selected_names(selected)) == 2
+
+
+def test_sections_are_grouped_under_their_category(index):
+    selected = index.select("false smut or tungro", 2)
+
+    assert selected.index("### Fungal Diseases:") < selected.index("**False Smut**")
+    assert selected.index("### Viral Diseases:") < selected.index(
+        "**Rice Tungro Virus**"
+    )
+    assert len(selected_names(selected)) == 2
+
+
+def test_unmatched_question_falls_back_to_full_knowledge_base(index):
+    assert index.select("ជំងឺស្រូវ", 3) == index.full_text